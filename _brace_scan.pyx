@@ -0,0 +1,59 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+# Native port of information_flow._extract_brace_block.
+# Build with: python setup.py build_ext --inplace
+
+
+def extract_brace_block(str code, Py_ssize_t start_index):
+    """Return (body_string, end_index) of the brace block starting at start_index (position of '{').
+    Same scanner as information_flow._extract_brace_block, with the per-character loop in C.
+    """
+    cdef Py_ssize_t n = len(code)
+    cdef Py_ssize_t i = start_index
+    cdef Py_ssize_t i0, depth = 0
+    cdef Py_UCS4 c, quote
+
+    if i < 0 or i >= n or code[i] != u'{':
+        return '', i
+
+    i0 = i
+    i += 1
+    while i < n:
+        c = code[i]
+        # strings: single, double, template
+        if c == u'"' or c == u"'" or c == u'`':
+            quote = c
+            i += 1
+            while i < n:
+                c = code[i]
+                if c == u'\\':
+                    i += 2
+                    continue
+                i += 1
+                if c == quote:
+                    break
+            continue
+        if c == u'/' and i + 1 < n:
+            # block comment
+            if code[i + 1] == u'*':
+                i = code.find('*/', i + 2)
+                if i == -1:
+                    return code[i0+1:], n
+                i += 2
+                continue
+            # line comment
+            if code[i + 1] == u'/':
+                i = code.find('\n', i + 2)
+                if i == -1:
+                    return code[i0+1:], n
+                i += 1
+                continue
+        if c == u'{':
+            depth += 1
+        elif c == u'}':
+            if depth == 0:
+                return code[i0+1:i], i + 1
+            depth -= 1
+        i += 1
+
+    # no matching closing brace found
+    return code[i0+1:], n
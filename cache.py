@@ -0,0 +1,87 @@
+import os
+import pickle
+import sqlite3
+
+# Bump whenever the per-file results change shape or meaning, so results
+# computed by an older version of the analyzer are not reused.
+CACHE_VERSION = 6
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'sqm_project', 'cache.sqlite')
+
+
+class CachedAnalyzer:
+    """
+    Wraps a per-file analysis function with a persistent SQLite cache, so files
+    that have not changed since the last run are not analyzed again.
+
+    The cache holds one row per file path, replaced whenever the file is analyzed
+    again, so edits don't leave stale results behind; rows written by another
+    CACHE_VERSION are dropped when the cache is opened.
+
+    `analyze` takes a mapping path -> code and returns a mapping path -> result;
+    results containing an 'error' key are never cached.
+    """
+
+    def __init__(self, analyze, path=DEFAULT_CACHE_PATH):
+        self.analyze_sources = analyze
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            # table of the earlier layout, one row per (version, path, digest) hash
+            self.conn.execute('DROP TABLE IF EXISTS cache')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS results '
+                '(path BLOB PRIMARY KEY, version INTEGER, digest TEXT, value BLOB)'
+            )
+            self.conn.execute('DELETE FROM results WHERE version != ?', (CACHE_VERSION,))
+
+    @staticmethod
+    def path_key(file):
+        """Row key for a file: its path as bytes."""
+        # os.fsencode restores the raw bytes of file names that are not valid UTF-8
+        # (os.scandir hands those out with surrogate escapes, which .encode() rejects)
+        return os.fsencode(file)
+
+    def analyze(self, sources, digests):
+        """
+        Returns path -> result for every source, analyzing only the cache misses.
+        `digests` maps each path to a hash of the file's content (see common.read_source);
+        a cached result is only reused if it was computed from the same content.
+        """
+        results = {}
+        try:
+            for file in sources:
+                row = self.conn.execute(
+                    'SELECT version, digest, value FROM results WHERE path=?', (self.path_key(file),)
+                ).fetchone()
+                if row is None or row[0] != CACHE_VERSION or row[1] != digests[file]:
+                    continue
+                try:
+                    results[file] = pickle.loads(row[2])
+                except Exception:
+                    # corrupt or incompatible entry: analyze the file again, which overwrites it
+                    continue
+        except sqlite3.Error:
+            # unreadable cache: fall back to analyzing everything
+            results = {}
+
+        misses = {file: code for file, code in sources.items() if file not in results}
+        if not misses:
+            return results
+
+        fresh = self.analyze_sources(misses)
+        results.update(fresh)
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO results (path, version, digest, value) VALUES (?, ?, ?, ?)',
+                    [(self.path_key(file), CACHE_VERSION, digests[file],
+                      pickle.dumps(res, pickle.HIGHEST_PROTOCOL))
+                     for file, res in fresh.items() if 'error' not in res],
+                )
+        except sqlite3.Error:
+            # e.g. the database stayed locked by another worker; results are still valid
+            pass
+        return results
@@ -1,48 +1,204 @@
 import os
 import re
+import json
+import mmap
+import subprocess
+from hashlib import blake2b
+from typing import Iterator, Optional
 import esprima
 
-def get_js_files(root_dir):
+# Node.js helper that tokenizes a whole batch of sources with esprima in one process
+_TOKENIZE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tokenize_batch.js')
+
+# Set to False once spawning the Node tokenizer has failed in this process
+_node_available = True
+
+# Seconds a Node tokenizer run may take before it is killed and its batch is
+# tokenized in-process instead
+_NODE_TIMEOUT = 120
+
+# Build/dependency/cache folders that are never descended into
+_SKIP_DIRS = frozenset({
+    'node_modules', 'dist', 'build', '.next', '.git', 'coverage', '.cache',
+    '.turbo', '.parcel-cache', 'out', '__pycache__', 'vendor',
+})
+
+_JS_EXTENSIONS = frozenset({'.js', '.jsx', '.ts', '.tsx'})
+
+
+def _is_test_name(name: str) -> bool:
+    # test markers, matched case-insensitively; none contains a path separator,
+    # so checking each path component on its own matches checking the full path
+    lower = name.lower()
+    return '.test.' in lower or '.spec.' in lower or '__tests__' in lower
+
+
+def _scan(directory: str, in_tests: bool) -> Iterator[tuple[str, bool]]:
+    """
+    Yields (path, is_test) for the JS/TS files below directory using os.scandir,
+    whose DirEntry type checks need no extra stat() call, pruning skipped folders
+    on the way. in_tests tells whether directory's own path is a test path.
+    """
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_dir():
+                    # like os.walk: a symlink to a directory is a directory, but not descended into
+                    if entry.name not in _SKIP_DIRS and not entry.is_symlink():
+                        yield from _scan(entry.path, in_tests or _is_test_name(entry.name))
+                else:
+                    i = entry.name.rfind('.')
+                    if i >= 0 and entry.name[i:] in _JS_EXTENSIONS:
+                        yield entry.path, in_tests or _is_test_name(entry.name)
+    except OSError:
+        # unreadable directory; os.walk ignored these as well
+        return
+
+
+def get_js_files(root_dir: str) -> Iterator[tuple[str, bool]]:
     """
     Recursively finds all JS/TS/JSX/TSX files in a directory,
-    skipping common build/dependency folders.
+    skipping common build/dependency folders. Yields (path, is_test) pairs
+    lazily, as the directory tree is walked; is_test is set for paths that
+    look like tests (.test., .spec. or __tests__ anywhere in them).
     """
-    js_files = []
-    for root, dirs, files in os.walk(root_dir):
-        # Prune search by modifying dirs in-place
-        dirs[:] = [d for d in dirs if d not in ['node_modules', 'dist', 'build', '.next', '.git']]
-        
-        for f in files:
-            if f.endswith(('.js', '.jsx', '.ts', '.tsx')):
-                js_files.append(os.path.join(root, f))
-    return js_files
+    return _scan(root_dir, _is_test_name(root_dir))
+
 
+# Files at least this large are memory-mapped rather than read into a bytes object
+_MMAP_THRESHOLD = 64 * 1024
 
-def extract_tokens(file_path):
+
+def read_source(file_path: str) -> tuple[str, str]:
     """
-    Tokenizes a file using esprima, with a regex fallback
-    for files that fail parsing (e.g., complex TS syntax).
+    Reads a source file once and returns (code, digest): the text decoded as UTF-8
+    (undecodable bytes dropped, newlines normalized as in text mode) and the blake2b
+    hex digest of the raw bytes. Large files are memory-mapped, so hashing and
+    decoding read straight from the page cache without a heap copy of the bytes.
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size >= _MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest = blake2b(mapped).hexdigest()
+                code = str(mapped, 'utf-8', 'ignore')
+        else:
+            data = f.read()
+            digest = blake2b(data).hexdigest()
+            code = data.decode('utf-8', 'ignore')
+    if '\r' in code:
+        code = code.replace('\r\n', '\n').replace('\r', '\n')
+    return code, digest
+
+
+def parse_tokens(code: str) -> Optional[list[dict[str, str]]]:
+    """
+    Tokenizes source code using esprima.
+    Returns None for code esprima cannot tokenize (e.g., complex TS syntax).
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            code = f.read()
-        # Note: esprima may fail on TypeScript syntax.
         tokens = esprima.tokenize(code)
         return [{"type": t.type, "value": t.value} for t in tokens]
     except Exception:
-        # Fallback for non-standard JS or TypeScript
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            code = f.read()
-        pattern = r"[A-Za-z_][A-Za-z0-9_]|==|!=|<=|>=|=>|[+\-/=<>!&|^%]"
-        fake_tokens = re.findall(pattern, code)
-        return [{"type": "Punctuator" if re.match(r'\W', t) else "Identifier", "value": t} for t in fake_tokens]
+        return None
+
+
+# Rough regex tokenizer: group 1 matches identifier-like operands, group 2 operators
+_FALLBACK_TOKEN_RE = re.compile(r"([A-Za-z_][A-Za-z0-9_])|(==|!=|<=|>=|=>|[+\-/=<>!&|^%])")
+
+
+def fallback_classify(code: str) -> tuple[list[str], list[str]]:
+    """
+    Rough regex tokenization for non-standard JS or TypeScript that esprima
+    cannot tokenize, split straight into (operators, operands).
+    """
+    matches = _FALLBACK_TOKEN_RE.findall(code)
+    operators = [operator for operand, operator in matches if operator]
+    operands = [operand for operand, operator in matches if operand]
+    return operators, operands
+
+
+def node_tokenizer_problem() -> Optional[str]:
+    """
+    Checks whether the Node.js/esprima batch tokenizer can run here by starting
+    it on empty input. Returns None when it can, else a short description of why not.
+    """
+    try:
+        proc = subprocess.run(
+            ['node', _TOKENIZE_SCRIPT], input='',
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, encoding='utf-8',
+            timeout=_NODE_TIMEOUT,
+        )
+    except OSError:
+        return 'node is not installed'
+    except subprocess.TimeoutExpired:
+        return 'node did not respond'
+    if proc.returncode != 0:
+        if "Cannot find module 'esprima'" in proc.stderr:
+            return 'the esprima npm package is missing; run `npm install` in ' + os.path.dirname(_TOKENIZE_SCRIPT)
+        return f'node exited with status {proc.returncode}'
+    return None
+
+
+def disable_node_tokenizer() -> None:
+    """Makes extract_tokens_batch return nothing in this process, without trying Node."""
+    global _node_available
+    _node_available = False
+
+
+def extract_tokens_batch(sources: dict[str, str]) -> dict[str, list[dict[str, str]]]:
+    """
+    Tokenizes many sources in a single Node.js/esprima subprocess.
+    Takes a mapping path -> code and returns a mapping path -> tokens for every
+    source Node managed to tokenize. Sources missing from the result (all of them
+    when Node or its esprima package is unavailable) should go through parse_tokens.
+    """
+    global _node_available
+    if not sources or not _node_available:
+        return {}
+
+    payload = ''.join(json.dumps({"path": p, "code": c}) + '\n' for p, c in sources.items())
+    try:
+        proc = subprocess.run(
+            ['node', _TOKENIZE_SCRIPT], input=payload,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, encoding='utf-8',
+            timeout=_NODE_TIMEOUT,
+        )
+    except OSError:
+        _node_available = False
+        return {}
+    except subprocess.TimeoutExpired:
+        # hung or far too slow; only this batch falls back
+        return {}
+
+    tokens: dict[str, list[dict[str, str]]] = {}
+    # tokenize_batch.js ends every record with '\n'; JSON.stringify leaves \x85,
+    # U+2028 and U+2029 unescaped inside token values, so splitlines() would cut records
+    for line in proc.stdout.split('\n'):
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if 'tokens' in record:
+            tokens[record['path']] = record['tokens']
+
+    if proc.returncode != 0 and not tokens:
+        # e.g. the esprima npm package is not installed; don't retry for every batch
+        _node_available = False
+    return tokens
+
+
+# Token types counted as Halstead operators; everything else is an operand
+_OPERATOR_TYPES = frozenset({"Keyword", "Punctuator"})
 
 
-def classify_tokens(tokens):
+def classify_tokens(tokens: list[dict[str, str]]) -> tuple[list[str], list[str]]:
     """Classifies tokens into operators and operands."""
-    operators, operands = [], []
+    operators: list[str] = []
+    operands: list[str] = []
     for t in tokens:
-        if t["type"] in ["Keyword", "Punctuator"]:
+        if t["type"] in _OPERATOR_TYPES:
             operators.append(t["value"])
         else:
             # Includes Identifier, Numeric, String, etc.
@@ -1,13 +1,25 @@
 import math
+from collections.abc import Mapping
+from typing import Union
 
-def halstead_metrics(operators, operands):
+# Either a Counter (token -> number of occurrences) or a plain list of tokens
+Tokens = Union[Mapping[str, int], list[str]]
+
+
+def _unique_and_total(tokens: Tokens) -> tuple[int, int]:
+    if isinstance(tokens, Mapping):
+        # a Counter already holds one entry per distinct token
+        return len(tokens), sum(tokens.values())
+    return len(set(tokens)), len(tokens)
+
+
+def halstead_metrics(operators: Tokens, operands: Tokens) -> dict[str, float]:
     """
-    Calculates Halstead complexity metrics from lists of operators and operands.
+    Calculates Halstead complexity metrics from the operators and operands, given
+    either as Counters (token -> number of occurrences) or as lists of tokens.
     """
-    n1 = len(set(operators)) # Unique operators
-    n2 = len(set(operands)) # Unique operands
-    N1 = len(operators)     # Total operators
-    N2 = len(operands)     # Total operands
+    n1, N1 = _unique_and_total(operators)  # Unique / total operators
+    n2, N2 = _unique_and_total(operands)   # Unique / total operands
 
     n = n1 + n2  # Vocabulary
     N = N1 + N2  # Program Length
@@ -21,8 +33,8 @@ def halstead_metrics(operators, operands):
             BasicInformation=0
         )
 
-    # Volume: V = N * log2(n)
-    volume = N * math.log2(n) if n > 1 else 0
+    # Volume: V = N * log2(n)  (n >= 1 here, and log2(1) == 0)
+    volume = N * math.log2(n)
 
     # Difficulty: D = (n1 / 2) * (N2 / n2)
     difficulty = (n1 / 2) * (N2 / n2)
@@ -1,63 +1,134 @@
 import re
+from bisect import bisect_left
 from collections import defaultdict
+from typing import Callable, Mapping, Optional
 
+# function definitions whose bodies are analyzed; group 1 is the function name
+_FUNC_PATTERNS = [re.compile(p) for p in (
+    r'function\s+([A-Za-z_][A-Za-z0-9_]*)\s*\([^)]*\)\s*\{',
+    r'exports\.([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(?:async\s*)?\([^)]*\)\s*=>\s*\{',
+    r'module\.exports\.([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(?:async\s*)?\([^)]*\)\s*=>\s*\{',
+    r'(?:const|let|var)\s+([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(?:async\s*)?\([^)]*\)\s*=>\s*\{',
+)]
 
-def _extract_brace_block(code, start_index):
+# call regex: the name right before '(' is the callee of both obj.method(...) and
+# plainFunction(...), so a single scan covers both
+_CALL_RE = re.compile(r'([A-Za-z_][A-Za-z0-9_]*)\s*\(')
+
+# tokens the brace scanner has to look at: string quotes, comment openers and braces
+_BRACE_TOKEN_RE = re.compile(r'["\'`{}]|/\*|//')
+
+# keywords and common builtins to ignore as callees
+_IGNORE_NAMES = frozenset(["if", "for", "while", "switch", "catch", "return", "new", "console", "Math", "Object", "Array"])
+
+
+def _skip_string(code: str, pos: int, quote: str) -> int:
+    """Return the index just past the closing `quote` of a string literal whose body starts at pos,
+    or -1 if the string is never closed. Quotes preceded by an odd number of backslashes are escaped.
+    """
+    while True:
+        j = code.find(quote, pos)
+        if j == -1:
+            return -1
+        k = j
+        while k > pos and code[k - 1] == '\\':
+            k -= 1
+        if (j - k) % 2 == 0:
+            return j + 1
+        pos = j + 1
+
+
+def _py_extract_brace_block(code: str, start_index: int) -> tuple[str, int]:
     """Return (body_string, end_index) of the brace block starting at start_index (position of '{').
     This is a simple scanner that skips over string literals and comments to avoid premature brace matches.
     If matching '}' isn't found, returns the rest of the code as body and len(code) as end_index.
     """
     n = len(code)
-    i = start_index
-    if i >= n or code[i] != '{':
-        return '', i
+    i0 = start_index
+    if i0 >= n or code[i0] != '{':
+        return '', i0
 
+    # jump between interesting tokens with the regex engine and skip over
+    # strings/comments with str.find, instead of stepping one character at a time
     depth = 0
-    i0 = i
-    i += 1
-    while i < n:
-        c = code[i]
-        # strings: single, double, template
-        if c == '"' or c == "'" or c == '`':
-            quote = c
-            i += 1
-            while i < n:
-                if code[i] == '\\':
-                    i += 2
-                    continue
-                if code[i] == quote:
-                    i += 1
-                    break
-                i += 1
-            continue
-        # block comment
-        if code[i:i+2] == '/*':
-            j = code.find('*/', i+2)
-            if j == -1:
-                return code[i0+1:], n
-            i = j + 2
-            continue
-        # line comment
-        if code[i:i+2] == '//':
-            j = code.find('\n', i+2)
-            if j == -1:
-                return code[i0+1:], n
-            i = j + 1
-            continue
-
-        if code[i] == '{':
+    pos = i0 + 1
+    while True:
+        m = _BRACE_TOKEN_RE.search(code, pos)
+        if m is None:
+            break
+        tok = m.group()
+        if tok == '{':
             depth += 1
-        elif code[i] == '}':
+            pos = m.end()
+        elif tok == '}':
             if depth == 0:
-                return code[i0+1:i], i + 1
+                return code[i0+1:m.start()], m.end()
             depth -= 1
-        i += 1
+            pos = m.end()
+        elif tok == '/*':
+            # block comment
+            j = code.find('*/', m.end())
+            if j == -1:
+                break
+            pos = j + 2
+        elif tok == '//':
+            # line comment
+            j = code.find('\n', m.end())
+            if j == -1:
+                break
+            pos = j + 1
+        else:
+            # strings: single, double, template
+            pos = _skip_string(code, m.end(), tok)
+            if pos == -1:
+                break
 
     # no matching closing brace found
     return code[i0+1:], n
 
 
-def compute_fan_in_out(code):
+# Prefer the compiled scanner when it has been built (see setup.py)
+_extract_brace_block: Callable[[str, int], tuple[str, int]]
+try:
+    import _brace_scan
+    _extract_brace_block = _brace_scan.extract_brace_block
+except ImportError:
+    _extract_brace_block = _py_extract_brace_block
+
+
+def _information_flow(functions: Mapping[str, object],
+                      name_to_callees: Mapping[str, set[str]]) -> dict[str, dict[str, int]]:
+    """Build the function_name -> { 'fan_in', 'fan_out', 'information_flow' } mapping
+    for the detected `functions` from their call sets.
+    """
+    # compute fan_in by counting callers
+    fan_in: defaultdict[str, int] = defaultdict(int)
+    fan_out: dict[str, int] = {}
+    for caller, callees in name_to_callees.items():
+        fan_out[caller] = len(callees)
+        for callee in callees:
+            fan_in[callee] += 1
+
+    # ensure functions with no outgoing calls appear with fan_out 0
+    for name in functions.keys():
+        fan_out.setdefault(name, 0)
+        fan_in.setdefault(name, 0)
+
+    # compute information flow metric
+    info_flow: dict[str, dict[str, int]] = {}
+    for name in functions.keys():
+        fi = fan_in.get(name, 0)
+        fo = fan_out.get(name, 0)
+        info_flow[name] = {
+            'fan_in': fi,
+            'fan_out': fo,
+            'information_flow': (fi * fo) ** 2
+        }
+
+    return info_flow
+
+
+def compute_fan_in_out(code: str) -> dict[str, dict[str, int]]:
     """Compute an estimated fan-in and fan-out per function in the given JS/TS code.
 
     Detection heuristics included:
@@ -76,18 +147,10 @@ def compute_fan_in_out(code):
     Returns a dict mapping function_name -> { 'fan_in': int, 'fan_out': int, 'information_flow': int }
     """
     try:
-        patterns = [
-            r'function\s+([A-Za-z_][A-Za-z0-9_]*)\s*\([^)]*\)\s*\{',
-            r'exports\.([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(?:async\s*)?\([^)]*\)\s*=>\s*\{',
-            r'module\.exports\.([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(?:async\s*)?\([^)]*\)\s*=>\s*\{',
-            r'(?:const|let|var)\s+([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(?:async\s*)?\([^)]*\)\s*=>\s*\{',
-        ]
-
         # find functions and their bodies
-        functions = {}
-        occupied_ranges = []
-        for pat in patterns:
-            for m in re.finditer(pat, code):
+        functions: dict[str, tuple[str, int, int]] = {}
+        for pat in _FUNC_PATTERNS:
+            for m in pat.finditer(code):
                 name = m.group(1)
                 brace_start = m.end() - 1
                 body, endpos = _extract_brace_block(code, brace_start)
@@ -95,53 +158,128 @@ def compute_fan_in_out(code):
                 if name not in functions or m.start() < functions[name][1]:
                     functions[name] = (body, m.start(), endpos)
         # Build a mapping name -> set(callees)
-        name_to_callees = defaultdict(set)
-
-        # call regex: captures both obj.method(...) and plainFunction(...)
-        method_call_re = re.compile(r'([A-Za-z_][A-Za-z0-9_]*)\.([A-Za-z_][A-Za-z0-9_]*)\s*\(')
-        func_call_re = re.compile(r'([A-Za-z_][A-Za-z0-9_]*)\s*\(')
-
-        # keywords and common builtins to ignore as callees
-        ignore_names = set(["if", "for", "while", "switch", "catch", "return", "new", "console", "Math", "Object", "Array"])
+        name_to_callees: defaultdict[str, set[str]] = defaultdict(set)
 
         for name, (body, startpos, endpos) in functions.items():
-            # find method calls like obj.method(...)
-            for mm in method_call_re.finditer(body):
-                callee = mm.group(2)
-                if callee != name and callee not in ignore_names:
-                    name_to_callees[name].add(callee)
-            # find plain function calls
-            for fm in func_call_re.finditer(body):
-                callee = fm.group(1)
+            callees_add = name_to_callees[name].add
+            # find method calls like obj.method(...) and plain function calls
+            for mm in _CALL_RE.finditer(body):
+                callee = mm.group(1)
                 # exclude language constructs and the function itself
-                if callee != name and callee not in ignore_names:
-                    name_to_callees[name].add(callee)
-
-        # compute fan_in by counting callers
-        fan_in = defaultdict(int)
-        fan_out = {}
-        for caller, callees in name_to_callees.items():
-            fan_out[caller] = len(callees)
-            for callee in callees:
-                fan_in[callee] += 1
-
-        # ensure functions with no outgoing calls appear with fan_out 0
-        for name in functions.keys():
-            fan_out.setdefault(name, 0)
-            fan_in.setdefault(name, 0)
-
-        # compute information flow metric
-        info_flow = {}
-        for name in functions.keys():
-            fi = fan_in.get(name, 0)
-            fo = fan_out.get(name, 0)
-            info_flow[name] = {
-                'fan_in': fi,
-                'fan_out': fo,
-                'information_flow': (fi * fo) ** 2
-            }
-
-        return info_flow
+                if callee != name and callee not in _IGNORE_NAMES:
+                    callees_add(callee)
+
+        return _information_flow(functions, name_to_callees)
+    except Exception:
+        # On any unexpected parsing error, return empty dict rather than crash
+        return {}
+
+
+# first token of every function definition _function_body_start recognizes
+_DEFINITION_STARTS = frozenset(['function', 'exports', 'const', 'let', 'var'])
+
+
+def _is_punct(tok: dict[str, str], value: str) -> bool:
+    return tok['type'] == 'Punctuator' and tok['value'] == value
+
+
+def _function_body_start(tokens: list[dict[str, str]], i: int) -> Optional[tuple[str, int]]:
+    """If one of the function definitions matched by compute_fan_in_out starts at tokens[i],
+    return (name, index of the '{' opening its body); otherwise return None.
+    """
+    n = len(tokens)
+    t = tokens[i]
+    if t['type'] == 'Keyword' and t['value'] == 'function':
+        # function NAME(...) {
+        if i + 1 >= n or tokens[i+1]['type'] != 'Identifier':
+            return None
+        name, j, arrow = tokens[i+1]['value'], i + 2, False
+    elif t['type'] == 'Identifier' and t['value'] == 'exports':
+        # exports.NAME = (...) => {   (also covers module.exports.NAME)
+        if i + 3 >= n or not _is_punct(tokens[i+1], '.') or tokens[i+2]['type'] != 'Identifier' \
+                or not _is_punct(tokens[i+3], '='):
+            return None
+        name, j, arrow = tokens[i+2]['value'], i + 4, True
+    elif t['type'] == 'Keyword' and t['value'] in ('const', 'let', 'var'):
+        # const|let|var NAME = (...) => {
+        if i + 2 >= n or tokens[i+1]['type'] != 'Identifier' or not _is_punct(tokens[i+2], '='):
+            return None
+        name, j, arrow = tokens[i+1]['value'], i + 3, True
+    else:
+        return None
+
+    if arrow and j < n and tokens[j]['type'] == 'Identifier' and tokens[j]['value'] == 'async':
+        j += 1
+    if j >= n or not _is_punct(tokens[j], '('):
+        return None
+    # parameters up to the first ')'
+    j += 1
+    while j < n and not _is_punct(tokens[j], ')'):
+        j += 1
+    j += 1
+    if arrow:
+        if j >= n or not _is_punct(tokens[j], '=>'):
+            return None
+        j += 1
+    if j >= n or not _is_punct(tokens[j], '{'):
+        return None
+    return name, j
+
+
+def compute_fan_in_out_from_tokens(tokens: list[dict[str, str]]) -> dict[str, dict[str, int]]:
+    """Token-stream version of compute_fan_in_out, for code esprima has already tokenized.
+
+    Detects the same function definitions and calls (an Identifier followed by '('), but
+    walks the in-memory token list and matches braces by depth instead of re-scanning
+    the source text, so strings and comments can no longer produce false matches.
+    Returns the same mapping as compute_fan_in_out.
+    """
+    try:
+        n = len(tokens)
+
+        # one walk over the tokens collects brace pairs, call sites and definitions
+        closing: dict[int, int] = {}          # index of '{' -> index of its matching '}'
+        open_braces: list[int] = []
+        call_indices: list[int] = []           # index and callee of every Identifier followed by '('
+        call_sites: list[str] = []
+        definitions: list[tuple[str, int]] = []  # (name, index of the '{' opening its body)
+        prev: Optional[dict[str, str]] = None
+        for i, t in enumerate(tokens):
+            if t['type'] == 'Punctuator':
+                v = t['value']
+                if v == '{':
+                    open_braces.append(i)
+                elif v == '}':
+                    if open_braces:
+                        closing[open_braces.pop()] = i
+                elif v == '(' and prev is not None and prev['type'] == 'Identifier':
+                    call_indices.append(i - 1)
+                    call_sites.append(prev['value'])
+            elif t['value'] in _DEFINITION_STARTS:
+                found = _function_body_start(tokens, i)
+                if found is not None:
+                    definitions.append(found)
+            prev = t
+        # unclosed bodies run to the end of the file
+        for i in open_braces:
+            closing[i] = n
+
+        # the first definition of a name wins
+        functions: dict[str, tuple[int, int]] = {}
+        for name, brace in definitions:
+            if name not in functions:
+                functions[name] = (brace, closing[brace])
+
+        # Build a mapping name -> set(callees) from the call sites inside each body
+        name_to_callees: defaultdict[str, set[str]] = defaultdict(set)
+        for name, (start, end) in functions.items():
+            callees = name_to_callees[name]
+            for k in range(bisect_left(call_indices, start), bisect_left(call_indices, end)):
+                callee = call_sites[k]
+                if callee != name and callee not in _IGNORE_NAMES:
+                    callees.add(callee)
+
+        return _information_flow(functions, name_to_callees)
     except Exception:
         # On any unexpected parsing error, return empty dict rather than crash
         return {}
@@ -1,26 +1,63 @@
 import re
 
-def compute_live_vars(code):
+# One scanner for both declarations and usages: every match is an identifier-like
+# usage, and the 'decl' group is set when it is a `let|const|var NAME` declaration.
+# A declaration covers the keyword's usage plus the declared name's, except when the
+# name runs into a non-ASCII word character (e.g. `let café`): it is still declared
+# ('caf') but, as a usage, needs a word boundary after it ('named' group).
+_LIVE_VAR_RE = re.compile(
+    r'\b(?:(?:let|const|var)\s+(?P<decl>[A-Za-z_][A-Za-z0-9_]*)(?P<named>\b)?|[A-Za-z_][A-Za-z0-9_]*\b)'
+)
+
+def compute_live_vars(code: str) -> tuple[int, float]:
     """
     Estimates live variables using the simple regex method
     from the provided base code.
     """
+    unique_vars: set[str] = set()
+    usage_count = 0
     try:
-        # Find declarations
-        vars_declared = re.findall(r'\b(?:let|const|var)\s+([A-Za-z_][A-Za-z0-9_]*)', code)
-        
-        # Find all usages (this is a very broad regex from the base code)
-        vars_used = re.findall(r'\b([A-Za-z_][A-Za-z0-9_]*)\b', code)
+        # Single pass: find declarations and count all usages
+        # (the usage part is a very broad regex from the base code)
+        for m in _LIVE_VAR_RE.finditer(code):
+            decl = m.group('decl')
+            if decl is None:
+                usage_count += 1
+            else:
+                unique_vars.add(decl)
+                usage_count += 1 if m.group('named') is None else 2
     except Exception:
         return 0, 0 # Handle potential regex errors
 
-    unique_vars = set(vars_declared)
-    
     # Total unique variables declared in the file
-    live_vars = len(unique_vars) 
-    
+    live_vars = len(unique_vars)
+
     # Average "liveness" per the base code's logic
     # (Total usages / total unique declarations)
-    avg_live = len(vars_used) / max(1, len(unique_vars))
-    
-    return live_vars, avg_live
\ No newline at end of file
+    avg_live = usage_count / max(1, len(unique_vars))
+
+    return live_vars, avg_live
+
+
+def compute_live_vars_from_tokens(tokens: list[dict[str, str]]) -> tuple[int, float]:
+    """
+    Token-stream version of compute_live_vars, for code esprima has already tokenized.
+    A declaration is a let/const/var keyword followed by an identifier, and every
+    Identifier token is a usage (keywords, strings and comments are no longer counted).
+    """
+    unique_vars: set[str] = set()
+    usage_count = 0
+    after_decl_keyword = False
+    for t in tokens:
+        if t["type"] == "Identifier":
+            usage_count += 1
+            if after_decl_keyword:
+                unique_vars.add(t["value"])
+            after_decl_keyword = False
+        else:
+            after_decl_keyword = t["type"] == "Keyword" and t["value"] in ("let", "const", "var")
+
+    live_vars = len(unique_vars)
+    avg_live = usage_count / max(1, len(unique_vars))
+
+    return live_vars, avg_live
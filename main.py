@@ -1,115 +1,252 @@
 import os
 import sys
-from collections import defaultdict
+import sqlite3
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
 
 # Import the metric calculations from our new modules
 import argparse
 import json
 
-from common import get_js_files, extract_tokens, classify_tokens
+try:
+    import orjson
+except ImportError:
+    # optional: faster JSON encoding for --json output
+    orjson = None
+
+from cache import CachedAnalyzer
+from common import get_js_files, read_source, node_tokenizer_problem, disable_node_tokenizer, parse_tokens, fallback_classify, extract_tokens_batch, classify_tokens
 from halstead import halstead_metrics
-from information_flow import compute_fan_in_out
-from live_variables import compute_live_vars
+from information_flow import compute_fan_in_out, compute_fan_in_out_from_tokens
+from live_variables import compute_live_vars, compute_live_vars_from_tokens
 from size_metrics import compute_size_metrics
 from oo_metrics import compute_oo_metrics
 from testing_metrics import compute_testing_metrics
 
-def analyze_project(directories):
+def _analyze_one(code, tokens=None):
+    """
+    Computes the per-file metrics for a single source file.
+    `tokens` are the file's pre-computed esprima tokens, if any.
+    """
+    if tokens is None:
+        tokens = parse_tokens(code)
+
+    if tokens is not None:
+        # walk the esprima token stream instead of re-scanning the source
+        lv, avg_lv = compute_live_vars_from_tokens(tokens)
+        info_flow = compute_fan_in_out_from_tokens(tokens)
+        ops, oprs = classify_tokens(tokens)
+    else:
+        # esprima could not tokenize it: regex-based estimates on the raw text
+        lv, avg_lv = compute_live_vars(code)
+        info_flow = compute_fan_in_out(code)
+        ops, oprs = fallback_classify(code)
+
+    return {
+        'ops': Counter(ops),
+        'oprs': Counter(oprs),
+        'live_vars': lv,
+        'avg_live': avg_lv,
+        'size': compute_size_metrics(code),
+        # fan-in/out per detected function, aligned by position
+        'fan_in': [v['fan_in'] for v in info_flow.values()],
+        'fan_out': [v['fan_out'] for v in info_flow.values()],
+        'oo': compute_oo_metrics(code),
+    }
+
+
+def _analyze_sources(sources):
+    """
+    Computes the per-file metrics for a mapping path -> code, tokenizing all
+    of them with a single Node/esprima process. Returns path -> result dict.
+    """
+    results = {}
+    batch_tokens = extract_tokens_batch(sources)
+    for file, code in sources.items():
+        try:
+            results[file] = _analyze_one(code, batch_tokens.get(file))
+        except Exception as e:
+            results[file] = {'error': str(e)}
+    return results
+
+
+# Per-process result cache, set up in each worker by _init_worker
+_analyzer = None
+
+
+def _init_worker(use_cache, use_node):
+    global _analyzer
+    if not use_node:
+        disable_node_tokenizer()
+    if use_cache:
+        try:
+            _analyzer = CachedAnalyzer(_analyze_sources)
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠ Result cache unavailable, analyzing without it: {e}")
+
+
+def _analyze_batch(entries):
+    """
+    Computes the per-file metrics for a batch of (file, is_test) entries.
+    Runs inside a worker process, so it must stay a top-level function and
+    return only plain (picklable) data: one (file, is_test, result dict) per entry.
+    """
+    files = [file for file, _ in entries]
+    results = {}
+    sources = {}
+    digests = {}
+    for file in files:
+        try:
+            sources[file], digests[file] = read_source(file)
+        except Exception as e:
+            results[file] = {'error': str(e)}
+
+    if _analyzer is not None:
+        results.update(_analyzer.analyze(sources, digests))
+    else:
+        results.update(_analyze_sources(sources))
+
+    return [(file, is_test, results[file]) for file, is_test in entries]
+
+
+# Files per worker task: enough to amortize IPC and the startup cost of the Node tokenizer
+_BATCH_SIZE = 32
+
+
+def _iter_files(directories):
+    """Yields the (file, is_test) entries of each directory in turn, reporting directories without any."""
+    for d in directories:
+        found = False
+        for entry in get_js_files(d):
+            found = True
+            yield entry
+        if not found:
+            print(f"ℹ No source files found in {d}")
+
+
+def _batches(entries, size):
+    """Groups an iterable of file entries into lists of at most `size` entries, lazily."""
+    it = iter(entries)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _map_bounded(ex, fn, items, window):
+    """
+    Like ex.map(fn, items), but with at most `window` tasks in flight.
+    Executor.map submits every item up front, draining a lazy `items` before the
+    first result comes back; this submits the next item only as results are
+    consumed, so memory stays bounded and results are folded while the walk runs.
+    Results are yielded in submission order.
+    """
+    pending = deque()
+    for item in items:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(ex.submit(fn, item))
+    while pending:
+        yield pending.popleft().result()
+
+
+def analyze_project(directories, use_cache=True):
     """
     Analyzes all files in the given directories and aggregates metrics.
+    With use_cache, per-file results are reused for files unchanged since a previous run.
     """
-    all_ops, all_oprs = [], []
+    op_counter, opr_counter = Counter(), Counter()
     total_live_vars = 0
     total_avg_live_metric = 0
-    info_flow_values = []
     fan_in_values = []
     fan_out_values = []
+    total_loc = 0
+    total_sloc = 0
+    total_comments = 0
+    total_blank = 0
+    total_avg_line_length = 0
+    total_classes = 0
+    total_methods = 0
+    max_inheritance_depth = 0
     file_count = 0
+    test_count = 0
 
-    all_files = []
-    for d in directories:
-        files = get_js_files(d)
-        if not files:
-            print(f"ℹ No source files found in {d}")
-            continue
-        all_files.extend(files)
+    # Per-file analysis is CPU-bound and independent, so fan it out to one
+    # worker per core. Batches are submitted while the directories are still
+    # being walked, a couple per worker at a time, so workers start on the first
+    # files straight away and finished results are aggregated as they arrive.
+    workers = os.cpu_count() or 1
 
-    if not all_files:
-        print("ℹ No source files found in any provided directory")
-        return None
+    # checked once here rather than failing silently in every worker
+    node_problem = node_tokenizer_problem()
+    if node_problem:
+        print(f"ℹ Node.js tokenizer unavailable ({node_problem}); tokenizing with the slower Python esprima")
+    batches = _batches(_iter_files(directories), _BATCH_SIZE)
 
-    for file in all_files:
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(use_cache, node_problem is None)) as ex:
+        batch_results = (item for batch in _map_bounded(ex, _analyze_batch, batches, 2 * workers) for item in batch)
+        for file, is_test, res in batch_results:
             file_count += 1
-            try:
-                with open(file, 'r', encoding='utf-8', errors='ignore') as f:
-                    code = f.read()
-
-                # 1. Halstead (token-based, aggregated)
-                tokens = extract_tokens(file)
-                ops, oprs = classify_tokens(tokens)
-                all_ops.extend(ops)
-                all_oprs.extend(oprs)
-
-                # 2. Live variable metrics (code-based, aggregated)
-                lv, avg_lv = compute_live_vars(code)
-                total_live_vars += lv
-                total_avg_live_metric += avg_lv
-
-                # 2.5 Size metrics (per-file aggregation)
-                sres = compute_size_metrics(code)
-                if sres:
-                    total_loc += sres.get('LOC', 0)
-                    total_sloc += sres.get('SLOC', 0)
-                    total_comments += sres.get('CommentLines', 0)
-                    total_blank += sres.get('BlankLines', 0)
-                    total_avg_line_length += sres.get('AvgLineLength', 0)
-
-                # 3. Henry–Kafura info (code-based, aggregated)
-                # compute_fan_in_out now returns a mapping function_name ->
-                # { 'fan_in': int, 'fan_out': int, 'information_flow': int }
-                info_flow = compute_fan_in_out(code)
-                if info_flow:
-                    # extract numeric information_flow, fan_in and fan_out values for averaging
-                    for v in info_flow.values():
-                        if isinstance(v, dict):
-                            if 'information_flow' in v:
-                                try:
-                                    info_flow_values.append(float(v['information_flow']))
-                                except Exception:
-                                    pass
-                            if 'fan_in' in v:
-                                try:
-                                    fan_in_values.append(float(v['fan_in']))
-                                except Exception:
-                                    pass
-                            if 'fan_out' in v:
-                                try:
-                                    fan_out_values.append(float(v['fan_out']))
-                                except Exception:
-                                    pass
-                        elif isinstance(v, (int, float)):
-                            info_flow_values.append(float(v))
-            
-            except Exception as e:
-                print(f"⚠ Could not analyze {file}: {e}")
-
-    if file_count == 0:
-        print("⚠ No valid files found to analyze.")
+            test_count += is_test
+            if 'error' in res:
+                print(f"⚠ Could not analyze {file}: {res['error']}")
+                continue
+
+            # 1. Halstead (token-based, aggregated)
+            op_counter.update(res['ops'])
+            opr_counter.update(res['oprs'])
+
+            # 2. Live variable metrics (code-based, aggregated)
+            total_live_vars += res['live_vars']
+            total_avg_live_metric += res['avg_live']
+
+            # 2.5 Size metrics (per-file aggregation)
+            sres = res['size']
+            if sres:
+                total_loc += sres.get('LOC', 0)
+                total_sloc += sres.get('SLOC', 0)
+                total_comments += sres.get('CommentLines', 0)
+                total_blank += sres.get('BlankLines', 0)
+                total_avg_line_length += sres.get('AvgLineLength', 0)
+
+            # 3. Henry–Kafura info (per-function fan-in/out, aggregated)
+            fan_in_values.extend(res['fan_in'])
+            fan_out_values.extend(res['fan_out'])
+
+            # 4. OO metrics: combine per-file detections
+            oores = res['oo']
+            if oores:
+                total_classes += int(oores.get('TotalClasses', 0))
+                total_methods += int(oores.get('TotalMethods', 0))
+                d = int(oores.get('MaxInheritanceDepth', 0))
+                if d > max_inheritance_depth:
+                    max_inheritance_depth = d
+
+    if not file_count:
+        print("ℹ No source files found in any provided directory")
         return None
 
     # --- Aggregate Metrics ---
 
     # 1. Halstead Metrics
-    halstead_results = halstead_metrics(all_ops, all_oprs)
+    halstead_results = halstead_metrics(op_counter, opr_counter)
     if not halstead_results:
         return None
 
     # 2. Information Flow Metrics
-    avg_info_flow = sum(info_flow_values) / max(1, len(info_flow_values))
-    total_fan_in = sum(fan_in_values)
-    total_fan_out = sum(fan_out_values)
-    avg_fan_in = total_fan_in / max(1, len(fan_in_values))
-    avg_fan_out = total_fan_out / max(1, len(fan_out_values))
+    # vectorized over every function in the project: IF = (fan_in * fan_out) ** 2
+    fi = np.asarray(fan_in_values, dtype=np.float64)
+    fo = np.asarray(fan_out_values, dtype=np.float64)
+    function_count = max(1, fi.size)
+    avg_info_flow = float(((fi * fo) ** 2).sum()) / function_count
+    total_fan_in = float(fi.sum())
+    total_fan_out = float(fo.sum())
+    avg_fan_in = total_fan_in / function_count
+    avg_fan_out = total_fan_out / function_count
 
     info_flow_results = {
         "AvgInformationFlow": avg_info_flow,
@@ -136,24 +273,7 @@ def analyze_project(directories):
         "AvgLiveVariablesPerFile": avg_live_vars_per_file,
     }
 
-    # 4. OO metrics: aggregate across files by combining per-file detections
-    total_classes = 0
-    total_methods = 0
-    max_inheritance_depth = 0
-    for file in all_files:
-        try:
-            with open(file, 'r', encoding='utf-8', errors='ignore') as f:
-                code = f.read()
-            oores = compute_oo_metrics(code)
-            if oores:
-                total_classes += int(oores.get('TotalClasses', 0))
-                total_methods += int(oores.get('TotalMethods', 0))
-                d = int(oores.get('MaxInheritanceDepth', 0))
-                if d > max_inheritance_depth:
-                    max_inheritance_depth = d
-        except Exception:
-            continue
-
+    # 4. OO metrics
     avg_methods_per_class = (total_methods / total_classes) if total_classes > 0 else 0
     oo_results = {
         'TotalClasses': total_classes,
@@ -162,8 +282,8 @@ def analyze_project(directories):
         'MaxInheritanceDepth': max_inheritance_depth,
     }
 
-    # 5. Testing metrics (file-list based)
-    test_metrics = compute_testing_metrics(all_files)
+    # 5. Testing metrics (test files were recognized by path during the walk)
+    test_metrics = compute_testing_metrics(test_count, file_count - test_count)
 
     # Return all metrics structured separately
     return {
@@ -176,10 +296,18 @@ def analyze_project(directories):
     }
 
 
+def _dumps(obj):
+    """Encodes obj as indented JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(obj, indent=2)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Compute code metrics for JS/TS projects')
     parser.add_argument('dirs', nargs='*', help='Root directories to analyze', default=["./frontend/src", "./backend"])
     parser.add_argument('--json', action='store_true', help='Output results as JSON')
+    parser.add_argument('--no-cache', action='store_true', help='Analyze every file, ignoring cached per-file results')
     args = parser.parse_args()
 
     # Validate directories exist
@@ -192,14 +320,14 @@ if __name__ == "__main__":
         sys.exit(2)
 
     print(f"🔍 Analyzing project for metrics in: {valid_dirs}\n")
-    all_metrics = analyze_project(valid_dirs)
+    all_metrics = analyze_project(valid_dirs, use_cache=not args.no_cache)
 
     if not all_metrics:
         print("⚠ Analysis finished, but no metrics were calculated.")
         sys.exit(0)
 
     if args.json:
-        print(json.dumps(all_metrics, indent=2))
+        print(_dumps(all_metrics))
         sys.exit(0)
 
     # Helper function for printing
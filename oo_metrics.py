@@ -1,11 +1,19 @@
 import re
 from collections import defaultdict
+from typing import Any
 
 # Reuse the brace block extractor from information_flow for robust class body extraction
 from information_flow import _extract_brace_block
 
+_CLASS_RE = re.compile(r'class\s+([A-Za-z_][A-Za-z0-9_]*)(?:\s+extends\s+([A-Za-z_][A-Za-z0-9_]*))?\s*\{')
 
-def compute_oo_metrics(code):
+# method pattern: name(...) {  (this will also match nested functions; it's an approximation)
+_METHOD_RE = re.compile(r'([A-Za-z_][A-Za-z0-9_]*)\s*\([^)]*\)\s*\{')
+
+_NON_METHOD_NAMES = frozenset(['if', 'for', 'while', 'switch', 'catch', 'return', 'new'])
+
+
+def compute_oo_metrics(code: str) -> dict[str, float]:
     """
     Simple OO metrics for JS/TS code.
     Returns a dict with: TotalClasses, TotalMethods, AvgMethodsPerClass, MaxInheritanceDepth
@@ -13,24 +21,23 @@ def compute_oo_metrics(code):
     if not code:
         return {}
 
-    class_re = re.compile(r'class\s+([A-Za-z_][A-Za-z0-9_]*)(?:\s+extends\s+([A-Za-z_][A-Za-z0-9_]*))?\s*\{')
+    classes: dict[str, dict[str, Any]] = {}
+    parents: dict[str, str] = {}
 
-    classes = {}
-    parents = {}
-
-    for m in class_re.finditer(code):
+    for m in _CLASS_RE.finditer(code):
         name = m.group(1)
         parent = m.group(2)
         brace_start = m.end() - 1
         body, endpos = _extract_brace_block(code, brace_start)
 
-        # method pattern: name(...) {  (this will also match nested functions; it's an approximation)
-        method_re = re.compile(r'([A-Za-z_][A-Za-z0-9_]*)\s*\([^)]*\)\s*\{')
+        # scan the body in place (pos/endpos) rather than a sliced copy; like a scan
+        # of the slice, no match can start before the body or run past its end
+        start = brace_start + 1
         methods = set()
-        for mm in method_re.finditer(body):
+        for mm in _METHOD_RE.finditer(code, start, start + len(body)):
             method_name = mm.group(1)
             # ignore common keywords
-            if method_name in ('if', 'for', 'while', 'switch', 'catch', 'return', 'new'):
+            if method_name in _NON_METHOD_NAMES:
                 continue
             methods.add(method_name)
 
@@ -45,26 +52,37 @@ def compute_oo_metrics(code):
     total_methods = sum(c['methods_count'] for c in classes.values())
     avg_methods = (total_methods / total_classes) if total_classes > 0 else 0
 
-    # compute max inheritance depth by walking parent links
-    def depth_of(cls, seen=None):
-        if seen is None:
-            seen = set()
-        if cls in seen:
-            return 0
-        seen.add(cls)
-        parent = parents.get(cls)
-        if not parent or parent == cls:
-            return 1
-        return 1 + depth_of(parent, seen)
+    # compute max inheritance depth by walking parent links; every class on a walk
+    # is memoized, so each parent link is followed once across all classes
+    depth_cache: dict[str, int] = {}
+
+    def depth_of(cls: str) -> int:
+        path: list[str] = []
+        on_path: dict[str, int] = {}
+        cur = cls
+        while cur not in depth_cache:
+            if cur in on_path:
+                # an inheritance cycle: walking from any of its classes stops when it
+                # comes back round, after visiting each class of the cycle once
+                cycle_start = on_path[cur]
+                for node in path[cycle_start:]:
+                    depth_cache[node] = len(path) - cycle_start
+                del path[cycle_start:]
+                break
+            parent = parents.get(cur)
+            if not parent or parent == cur:
+                depth_cache[cur] = 1
+                break
+            on_path[cur] = len(path)
+            path.append(cur)
+            cur = parent
+        d = depth_cache[cur]
+        for node in reversed(path):
+            d += 1
+            depth_cache[node] = d
+        return depth_cache[cls]
 
-    max_depth = 0
-    for c in classes.keys():
-        try:
-            d = depth_of(c)
-            if d > max_depth:
-                max_depth = d
-        except Exception:
-            continue
+    max_depth = max(map(depth_of, classes), default=0)
 
     return {
         'TotalClasses': total_classes,
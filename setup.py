@@ -0,0 +1,34 @@
+"""
+Builds the optional native extensions in place:
+
+    python setup.py build_ext --inplace
+
+- _brace_scan: Cython port of the brace-block scanner
+- the metric modules below, compiled ahead of time with mypyc
+
+The analyzer runs without them: the plain .py modules are imported when
+nothing is built, and information_flow falls back to the pure Python brace
+scanner when _brace_scan is missing.
+"""
+from setuptools import setup
+from Cython.Build import cythonize
+from mypyc.build import mypycify
+
+MYPYC_MODULES = [
+    'common.py',
+    'halstead.py',
+    'live_variables.py',
+    'information_flow.py',
+    'oo_metrics.py',
+    'size_metrics.py',
+]
+
+setup(
+    name='sqm-metrics',
+    py_modules=[],
+    ext_modules=(
+        cythonize(['_brace_scan.pyx'], language_level=3)
+        # esprima and _brace_scan ship without type information
+        + mypycify(['--ignore-missing-imports'] + MYPYC_MODULES, opt_level='3')
+    ),
+)
@@ -1,6 +1,22 @@
-import re
+from typing import Optional
 
-def compute_size_metrics(code):
+# str.splitlines() breaks at these besides '\n'; in ASCII text there are no others
+_ASCII_LINE_BREAKS = ('\r', '\v', '\f', '\x1c', '\x1d', '\x1e')
+
+
+def _split_lines(code: str) -> list[str]:
+    """code.splitlines(), using the cheaper split('\\n') when it gives the same lines."""
+    # isascii() only reads a flag on the string; the `in` checks are memchr scans
+    if code.isascii() and not any(c in code for c in _ASCII_LINE_BREAKS):
+        lines = code.split('\n')
+        if not lines[-1]:
+            # no line after a trailing newline (or in an empty file)
+            lines.pop()
+        return lines
+    return code.splitlines()
+
+
+def compute_size_metrics(code: Optional[str]) -> dict[str, float]:
     """
     Estimates simple size metrics from a source file's text.
     Returns a dict with: LOC, SLOC (source lines), CommentLines, BlankLines, AvgLineLength
@@ -8,17 +24,15 @@ def compute_size_metrics(code):
     if code is None:
         return {}
 
-    lines = code.splitlines()
+    lines = _split_lines(code)
     loc = len(lines)
+    total_len = sum(map(len, lines))
     blank_lines = 0
     comment_lines = 0
-    total_len = 0
 
     # rough block comment handling
     in_block = False
-    for line in lines:
-        stripped = line.strip()
-        total_len += len(line)
+    for stripped in map(str.strip, lines):
         if not stripped:
             blank_lines += 1
             continue
@@ -30,15 +44,16 @@ def compute_size_metrics(code):
                 in_block = False
             continue
 
-        if stripped.startswith('//'):
-            comment_lines += 1
+        # most lines are code: one character comparison rules them out
+        if stripped[0] != '/':
             continue
-
-        if stripped.startswith('/*'):
+        second = stripped[1:2]
+        if second == '/':
+            comment_lines += 1
+        elif second == '*':
             comment_lines += 1
             if '*/' not in stripped:
                 in_block = True
-            continue
 
     sloc = loc - comment_lines - blank_lines
     avg_len = (total_len / loc) if loc > 0 else 0
@@ -0,0 +1,26 @@
+#!/usr/bin/env node
+// tokenize_batch - tokenizes many sources with esprima in a single process
+// Input (stdin):  one JSON record per line, {"path": ..., "code": ...}
+// Output (stdout): one JSON record per line, {"path": ..., "tokens": [{type, value}, ...]}
+//                  or {"path": ..., "error": ...} when esprima cannot tokenize the source
+// Requires the esprima package pinned in package.json: run `npm install` next to this file.
+
+const readline = require('readline');
+const esprima = require('esprima');
+
+const rl = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+
+rl.on('line', (line) => {
+  if (!line) {
+    return;
+  }
+  const { path, code } = JSON.parse(line);
+  let record;
+  try {
+    const tokens = esprima.tokenize(code).map((t) => ({ type: t.type, value: t.value }));
+    record = { path, tokens };
+  } catch (e) {
+    record = { path, error: String(e && e.message ? e.message : e) };
+  }
+  process.stdout.write(JSON.stringify(record) + '\n');
+});